@@ -13,49 +13,48 @@ Usage
 -----
 python yt_dumper.py CHANNEL_ID [--json]
 python yt_dumper.py CHANNEL_ID --json [output_file.json]
+python yt_dumper.py CHANNEL_ID --cache
+python yt_dumper.py CHANNEL_ID --no-sort [output_file.csv]
+python yt_dumper.py CHANNEL_ID --concurrency 4
+python yt_dumper.py --help
 """
+import argparse
 import os
 import sys
 import requests
 import json
-import csv
-from datetime import datetime, timezone
+import orjson
+import re
+import shelve
+import stat
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import chain
+from datetime import date, datetime, timezone
 from dotenv import dotenv_values
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# Load environment variables
-import stat
+# Load environment variables. .env may be a regular file or a FIFO pipe
+# written by 1Password; dotenv_values(".env") ignores anything that isn't a
+# regular file, so open it here and hand the stream to dotenv's parser.
 print("DEBUG: Loading .env file...")
 
 env_vars = {}
 
-# Check if .env is a FIFO pipe
 if os.path.exists(".env"):
     try:
-        file_stat = os.stat(".env")
-        if stat.S_ISFIFO(file_stat.st_mode):
+        if stat.S_ISFIFO(os.stat(".env").st_mode):
             print("DEBUG: .env is a FIFO pipe (1Password integration)")
-            # Read directly from the named pipe
-            try:
-                with open(".env", "r") as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith("#") and "=" in line:
-                            key, value = line.split("=", 1)
-                            env_vars[key] = value
-                print(f"DEBUG: Loaded {len(env_vars)} vars from FIFO pipe")
-            except Exception as e:
-                print(f"ERROR: Failed to read from FIFO pipe: {e}")
-                print("Make sure 1Password is configured to write to this pipe")
-        else:
-            print(f"DEBUG: .env is regular file ({file_stat.st_size} bytes)")
-            # Use dotenv_values for regular files
-            try:
-                env_vars = dotenv_values(".env")
-                print(f"DEBUG: Loaded {len(env_vars)} vars from .env")
-            except Exception as e:
-                print(f"ERROR: Failed to load .env: {e}")
-    except OSError as e:
-        print(f"ERROR: Cannot stat .env: {e}")
+        with open(".env", "r", encoding="utf-8") as f:
+            env_vars = dotenv_values(stream=f)
+        print(f"DEBUG: Loaded {len(env_vars)} vars from .env")
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"ERROR: Failed to read .env: {e}")
+        print("If .env is a 1Password pipe, make sure 1Password is configured to write to it")
 
 # Fallback to environment variables if .env loading failed
 if not env_vars:
@@ -72,13 +71,40 @@ if API_KEY:
 else:
     print("ERROR: No API key found")
 BASE_URL = "https://www.googleapis.com/youtube/v3"
+WATCH_URL = "https://www.youtube.com/watch?v="
+MAX_WORKERS = 10  # concurrent /videos requests, kept low to be gentle on quota
+POOL_SIZE = 20  # keep-alive connections; workers plus the paging thread must fit
+CACHE_TTL = 24 * 60 * 60  # seconds a cached video is reused before refetching
+# Partial response covering only what export_to_csv reads
+CSV_FIELDS = (
+    "items(id,snippet(title,publishedAt,description,tags,categoryId),"
+    "statistics(viewCount,likeCount,commentCount),contentDetails/duration,"
+    "status(privacyStatus,madeForKids))"
+)
+DURATION_RE = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?')
+
+# One pooled session keeps TLS connections to googleapis.com alive across
+# requests and retries transient server errors with backoff.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=POOL_SIZE,
+    pool_maxsize=POOL_SIZE,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        raise_on_status=False
+    )
+))
+# Google APIs only gzip responses when the User-Agent contains "gzip"
+SESSION.headers["User-Agent"] += " (gzip)"
 
 if not API_KEY:
     sys.exit("Error: YT_API_KEY not found in .env file or environment variables")
 
 def search_channel_by_name(channel_name: str) -> str:
     """Search for a channel by name and return the channel ID."""
-    r = requests.get(
+    r = SESSION.get(
         f"{BASE_URL}/search",
         params={
             "part": "snippet",
@@ -91,7 +117,7 @@ def search_channel_by_name(channel_name: str) -> str:
     )
     
     try:
-        data = r.json()
+        data = orjson.loads(r.content)
         if r.status_code != 200:
             error_message = data.get('error', {}).get('message', 'Unknown error')
             sys.exit(f"Search API Error: {error_message}")
@@ -110,7 +136,7 @@ def search_channel_by_name(channel_name: str) -> str:
         sys.exit(f"Invalid JSON response from search API: {r.text}")
 
 def get_uploads_playlist_id(channel_id: str) -> str:
-    r = requests.get(
+    r = SESSION.get(
         f"{BASE_URL}/channels",
         params={
             "part": "contentDetails",
@@ -121,19 +147,19 @@ def get_uploads_playlist_id(channel_id: str) -> str:
     )
     
     if r.status_code == 403:
-        error_data = r.json()
+        error_data = orjson.loads(r.content)
         error_message = error_data.get('error', {}).get('message', 'Unknown error')
         if 'API key not valid' in error_message or 'quota' in error_message.lower():
             sys.exit(f"API Error: {error_message}\nPlease check your API key and ensure YouTube Data API v3 is enabled.")
         else:
             sys.exit(f"API Error: {error_message}")
     elif r.status_code == 400:
-        error_data = r.json()
+        error_data = orjson.loads(r.content)
         error_message = error_data.get('error', {}).get('message', 'Invalid request')
         sys.exit(f"Invalid request: {error_message}")
     
     try:
-        data = r.json()
+        data = orjson.loads(r.content)
         if r.status_code != 200:
             error_message = data.get('error', {}).get('message', 'Unknown error')
             if 'API key not valid' in error_message or 'quota' in error_message.lower():
@@ -150,53 +176,172 @@ def get_uploads_playlist_id(channel_id: str) -> str:
     except json.JSONDecodeError:
         sys.exit(f"Invalid JSON response from API: {r.text}")
 
-def get_all_video_ids(playlist_id: str) -> list[str]:
-    ids, page_token = [], ""
+def iter_video_id_batches(playlist_id: str) -> Iterator[list[str]]:
+    """Yield the video IDs of a playlist one page (up to 50 IDs) at a time."""
+    page_token = ""
     while True:
-        r = requests.get(
+        r = SESSION.get(
             f"{BASE_URL}/playlistItems",
             params={
                 "part": "contentDetails",
                 "playlistId": playlist_id,
                 "maxResults": 50,
                 "pageToken": page_token,
+                # Only the video IDs and the cursor are needed; trimming the
+                # response keeps each sequential page round trip small.
+                "fields": "nextPageToken,items/contentDetails/videoId",
                 "key": API_KEY
             },
             timeout=10
         )
         r.raise_for_status()
-        data = r.json()
-        ids.extend(item["contentDetails"]["videoId"] for item in data["items"])
+        data = orjson.loads(r.content)
+        yield [item["contentDetails"]["videoId"] for item in data["items"]]
         page_token = data.get("nextPageToken", "")
         if not page_token:
             break
-    return ids
 
-def chunks(lst, n):
-    for i in range(0, len(lst), n):
-        yield lst[i:i + n]
+def fetch_batch(batch: list[str], fields: str = None) -> list[dict]:
+    """Fetch metadata for a single batch of up to 50 video IDs.
+
+    fields, if given, is passed through as the API's partial response filter.
+    """
+    params = {
+        "part": "snippet,statistics,contentDetails,status",
+        "id": ",".join(batch),
+        "key": API_KEY
+    }
+    if fields:
+        params["fields"] = fields
+    r = SESSION.get(f"{BASE_URL}/videos", params=params, timeout=10)
+    r.raise_for_status()
+    return orjson.loads(r.content)["items"]
+
+def iter_in_order(futures: Iterable[Future], window: int) -> Iterator[Future]:
+    """Yield futures in submission order, keeping at most window outstanding."""
+    in_flight = deque()
+    for future in futures:
+        in_flight.append(future)
+        if len(in_flight) >= window:
+            yield in_flight.popleft()
+    yield from in_flight
+
+def iter_videos(id_batches: Iterable[list[str]], fields: str = None,
+                max_workers: int = MAX_WORKERS) -> Iterator[list[dict]]:
+    """Fetch batches of video IDs concurrently and yield their items in order.
+
+    Each batch is submitted as soon as it is produced, so passing
+    iter_video_id_batches() overlaps /videos requests with playlist paging.
+    At most 2 * max_workers batches are in flight, which bounds memory.
+    """
+    fetch = partial(fetch_batch, fields=fields)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = (executor.submit(fetch, batch) for batch in id_batches)
+        for future in iter_in_order(futures, 2 * max_workers):
+            yield future.result()
+
+def iter_metadata(id_batches: Iterable[list[str]], cache_path: str = None,
+                  fields: str = None, max_workers: int = MAX_WORKERS) -> Iterator[list[dict]]:
+    """Yield comprehensive video metadata, without truncation, batch by batch.
+
+    With cache_path, videos fetched less than CACHE_TTL ago are read from an
+    on-disk shelve cache and only the rest are requested from the API. Cached
+    and fetched videos are regrouped into separate batches of 50, so the
+    output is not in strict playlist order. Passing fields (e.g. CSV_FIELDS)
+    trims each item to those fields.
+    """
+    if not cache_path:
+        yield from iter_videos(id_batches, fields, max_workers)
+        return
+    
+    fetch = partial(fetch_batch, fields=fields)
+    from_cache = set()
+    
+    def cached_batch(items):
+        future = Future()
+        future.set_result(items)
+        from_cache.add(future)
+        return future
+    
+    def batch_futures(cache, now, executor):
+        # Cache hits become already-resolved futures so they flow through the
+        # same bounded, ordered window as the API requests
+        pending, hits = [], []
+        for batch in id_batches:
+            for video_id in batch:
+                entry = cache.get(video_id)
+                # Full items can serve a trimmed request, but not vice versa
+                if (entry and now - entry["fetched_at"] < CACHE_TTL
+                        and entry.get("fields") in (None, fields)):
+                    hits.append(entry["item"])
+                else:
+                    pending.append(video_id)
+            # Regroup uncached IDs into full batches of 50 to save quota
+            while len(pending) >= 50:
+                yield executor.submit(fetch, pending[:50])
+                pending = pending[50:]
+            while len(hits) >= 50:
+                yield cached_batch(hits[:50])
+                hits = hits[50:]
+        if pending:
+            yield executor.submit(fetch, pending)
+        if hits:
+            yield cached_batch(hits)
+    
+    with shelve.open(cache_path) as cache, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        now = time.time()
+        cached_count = fetched_count = 0
+        futures = batch_futures(cache, now, executor)
+        for future in iter_in_order(futures, 2 * max_workers):
+            items = future.result()
+            if future in from_cache:
+                from_cache.discard(future)
+                cached_count += len(items)
+            else:
+                for item in items:
+                    cache[item["id"]] = {"fetched_at": now, "fields": fields, "item": item}
+                fetched_count += len(items)
+            yield items
+    print(f"Used {cached_count} cached videos, fetched {fetched_count}")
+
+def fetch_metadata(id_batches: Iterable[list[str]], cache_path: str = None,
+                   fields: str = None, max_workers: int = MAX_WORKERS) -> list[dict]:
+    """Fetch comprehensive metadata for videos without any truncation.
 
-def fetch_metadata(video_ids: list[str]) -> list[dict]:
-    """Fetch comprehensive metadata for videos without any truncation."""
+    See iter_metadata for cache_path, fields and max_workers.
+    """
     all_videos = []
-    for batch in chunks(video_ids, 50):
-        r = requests.get(
-            f"{BASE_URL}/videos",
-            params={
-                "part": "snippet,statistics,contentDetails,status",
-                "id": ",".join(batch),
-                "key": API_KEY
-            },
-            timeout=10
-        )
-        r.raise_for_status()
-        all_videos.extend(r.json()["items"])
+    for items in iter_metadata(id_batches, cache_path, fields, max_workers):
+        all_videos.extend(items)
     return all_videos
 
+@lru_cache(maxsize=None)
+def get_category_names(region_code: str = "US") -> dict[str, str]:
+    """Map video category IDs to their names, with one request per region."""
+    r = SESSION.get(
+        f"{BASE_URL}/videoCategories",
+        params={
+            "part": "snippet",
+            "regionCode": region_code,
+            "fields": "items(id,snippet/title)",
+            "key": API_KEY
+        },
+        timeout=10
+    )
+    r.raise_for_status()
+    return {item["id"]: item["snippet"]["title"] for item in orjson.loads(r.content)["items"]}
+
+@lru_cache(maxsize=4096)
 def format_duration(duration: str) -> str:
-    """Convert ISO 8601 duration to readable format."""
-    import re
-    match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration)
+    """Convert ISO 8601 duration to readable format.
+
+    Memoized: channels repeat the same few thousand durations many times.
+    """
+    # Seconds-only durations (Shorts, "PT0S") don't need the regex
+    if duration.startswith("PT") and duration[2:-1].isdigit() and duration[-1] == "S":
+        return f"0:{int(duration[2:-1]):02d}"
+
+    match = DURATION_RE.match(duration)
     if not match:
         return duration
     
@@ -210,75 +355,116 @@ def format_duration(duration: str) -> str:
     else:
         return f"{minutes}:{seconds:02d}"
 
-def export_to_csv(videos: list[dict], channel_id: str, output_file: str = None):
-    """Export videos to CSV format."""
+CSV_FIELDNAMES = [
+    'Video ID', 'Title', 'URL', 'Published Date', 'Age (days)',
+    'Duration', 'Views', 'Likes', 'Comments', 'Description',
+    'Tags', 'Category', 'Privacy Status', 'Made for Kids'
+]
+CSV_HEADER = ",".join(CSV_FIELDNAMES) + "\r\n"
+
+def csv_quote(value: str) -> str:
+    """Quote a free-text field the way csv.writer's QUOTE_MINIMAL would."""
+    if '"' in value or ',' in value or '\n' in value or '\r' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+def csv_row(video: dict, today: date, categories: dict[str, str]) -> str:
+    """Build one CSV line, in CSV_FIELDNAMES order, for a video.
+
+    Only Title, Description, Tags and Category can contain commas, quotes or
+    newlines; every other column is an ID, URL, timestamp, number or enum and
+    is written as-is, skipping csv.writer's per-character quoting scan.
+    """
+    snippet = video["snippet"]
+    statistics = video.get("statistics", {})
+    content_details = video.get("contentDetails", {})
+    status = video.get("status", {})
+    
+    # Calculate age in whole UTC days; only the YYYY-MM-DD prefix matters
+    age_days = (today - date.fromisoformat(snippet["publishedAt"][:10])).days
+    
+    # Truncate description to avoid CSV issues
+    description = snippet.get('description', 'No description')
+    if len(description) > 500:
+        description = description[:500] + "..."
+    
+    # Clean tags for CSV
+    tags = ', '.join(snippet.get('tags', []))
+    if len(tags) > 200:
+        tags = tags[:200] + "..."
+    
+    # Show the category name; IDs missing from the region's list stay as-is
+    category_id = snippet.get('categoryId', 'N/A')
+    category = categories.get(category_id, category_id)
+    
+    video_id = video['id']
+    return (
+        f"{video_id},"
+        f"{csv_quote(snippet['title'])},"
+        f"{WATCH_URL}{video_id},"
+        f"{snippet['publishedAt']},"
+        f"{age_days},"
+        f"{format_duration(content_details.get('duration', 'PT0S'))},"
+        f"{statistics.get('viewCount', 'N/A')},"
+        f"{statistics.get('likeCount', 'N/A')},"
+        f"{statistics.get('commentCount', 'N/A')},"
+        f"{csv_quote(description)},"
+        f"{csv_quote(tags)},"
+        f"{csv_quote(category)},"
+        f"{status.get('privacyStatus', 'N/A')},"
+        f"{status.get('madeForKids', 'N/A')}\r\n"
+    )
+
+def export_to_csv(videos: Iterable[dict], channel_id: str, output_file: str = None) -> int:
+    """Export videos to CSV format and return the number of rows written.
+
+    videos may be a lazy iterable; rows are written as it is consumed.
+    """
     if not output_file:
         output_file = f"{channel_id}_videos.csv"
     
-    fieldnames = [
-        'Video ID', 'Title', 'URL', 'Published Date', 'Age (days)', 
-        'Duration', 'Views', 'Likes', 'Comments', 'Description', 
-        'Tags', 'Category', 'Privacy Status', 'Made for Kids'
-    ]
-    
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
+    today = datetime.now(timezone.utc).date()
+    try:
+        categories = get_category_names()
+    except requests.RequestException as e:
+        # Category names are cosmetic; don't lose the export over them
+        print(f"WARNING: Could not fetch category names, writing IDs instead: {e}")
+        categories = {}
+    # A 1 MiB buffer turns the per-row writes into a few large ones
+    with open(output_file, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
+        csvfile.write(CSV_HEADER)
+        count = 0
         for video in videos:
-            snippet = video["snippet"]
-            statistics = video.get("statistics", {})
-            content_details = video.get("contentDetails", {})
-            status = video.get("status", {})
-            
-            # Calculate age
-            published = datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00"))
-            now = datetime.now(timezone.utc)
-            age_days = (now - published).days
-            
-            # Truncate description to avoid CSV issues
-            description = snippet.get('description', 'No description')
-            if len(description) > 500:
-                description = description[:500] + "..."
-            
-            # Clean tags for CSV
-            tags = ', '.join(snippet.get('tags', []))
-            if len(tags) > 200:
-                tags = tags[:200] + "..."
-            
-            row = {
-                'Video ID': video['id'],
-                'Title': snippet['title'],
-                'URL': f"https://www.youtube.com/watch?v={video['id']}",
-                'Published Date': snippet['publishedAt'],
-                'Age (days)': age_days,
-                'Duration': format_duration(content_details.get('duration', 'PT0S')),
-                'Views': statistics.get('viewCount', 'N/A'),
-                'Likes': statistics.get('likeCount', 'N/A'),
-                'Comments': statistics.get('commentCount', 'N/A'),
-                'Description': description,
-                'Tags': tags,
-                'Category': snippet.get('categoryId', 'N/A'),
-                'Privacy Status': status.get('privacyStatus', 'N/A'),
-                'Made for Kids': status.get('madeForKids', 'N/A')
-            }
-            writer.writerow(row)
+            csvfile.write(csv_row(video, today, categories))
+            count += 1
     
     print(f"CSV data exported to {output_file}")
+    return count
 
 def main():
-    if len(sys.argv) < 2:
-        sys.exit("Usage: python yt_dumper.py CHANNEL_NAME_OR_ID [--json] [output_file.csv|.json]")
-    
-    channel_input = sys.argv[1]
-    export_json = "--json" in sys.argv
-    output_file = None
+    parser = argparse.ArgumentParser(
+        description="List all videos on a YouTube channel with comprehensive metadata."
+    )
+    parser.add_argument("channel", help="channel name or channel ID (UC...)")
+    parser.add_argument("output_file", nargs="?",
+                        help="output file (default: {channel_id}_videos.csv, or stdout with --json)")
+    parser.add_argument("--json", action="store_true",
+                        help="export complete metadata as JSON instead of CSV")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse video metadata fetched within the last 24 hours")
+    parser.add_argument("--no-sort", action="store_true",
+                        help="skip sorting by publish date and stream CSV rows as they arrive")
+    parser.add_argument("--concurrency", type=int, default=MAX_WORKERS,
+                        help=f"concurrent /videos requests, 1-{POOL_SIZE - 1} (default: {MAX_WORKERS})")
+    # Intermixed so flags may sit between the channel and the output file
+    args = parser.parse_intermixed_args()
+    # One pooled connection stays free for playlist paging on the main thread
+    if not 1 <= args.concurrency <= POOL_SIZE - 1:
+        parser.error(f"--concurrency must be between 1 and {POOL_SIZE - 1}")
     
-    # Check for output file argument
-    for i, arg in enumerate(sys.argv[2:], 2):
-        if not arg.startswith("--") and arg != "--json":
-            output_file = arg
-            break
+    channel_input = args.channel
+    export_json = args.json
+    output_file = args.output_file
     
     # Check if input is a channel ID (starts with UC) or a channel name
     if channel_input.startswith("UC") and len(channel_input) == 24:
@@ -291,11 +477,25 @@ def main():
         channel_id = search_channel_by_name(channel_input)
     
     uploads_id = get_uploads_playlist_id(channel_id)
-    video_ids = get_all_video_ids(uploads_id)
-    videos = fetch_metadata(video_ids)
+    cache_path = f".yt_cache_{channel_id}" if args.cache else None
+    # The JSON export keeps complete items; CSV only needs its columns
+    fields = None if export_json else CSV_FIELDS
+    id_batches = iter_video_id_batches(uploads_id)
     
-    # Sort by publish date (newest first)
-    videos.sort(key=lambda x: x["snippet"]["publishedAt"], reverse=True)
+    if args.no_sort and not export_json:
+        # Stream rows to the CSV as batches arrive instead of holding every video
+        video_batches = iter_metadata(id_batches, cache_path, fields, args.concurrency)
+        count = export_to_csv(chain.from_iterable(video_batches), channel_id, output_file)
+        print(f"Found {count} videos on channel {channel_id}")
+        return
+    
+    videos = fetch_metadata(id_batches, cache_path, fields, args.concurrency)
+    
+    # Sort by publish date (newest first). ISO 8601 "Z" timestamps order
+    # lexicographically, and list.sort evaluates the key once per video;
+    # uploads arrive nearly newest-first already, so this is close to O(n).
+    if not args.no_sort:
+        videos.sort(key=lambda x: x["snippet"]["publishedAt"], reverse=True)
     
     print(f"Found {len(videos)} videos on channel {channel_id}")
     
@@ -308,14 +508,18 @@ def main():
             "videos": videos
         }
         
-        json_output = json.dumps(output_data, indent=2, ensure_ascii=False)
+        # Write orjson's UTF-8 bytes directly rather than decoding to a str copy
+        json_output = orjson.dumps(
+            output_data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+        )
         
         if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
+            with open(output_file, 'wb') as f:
                 f.write(json_output)
             print(f"JSON data exported to {output_file}")
         else:
-            print(json_output)
+            sys.stdout.flush()
+            sys.stdout.buffer.write(json_output)
     else:
         # Export to CSV by default
         export_to_csv(videos, channel_id, output_file)